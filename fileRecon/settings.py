@@ -54,6 +54,21 @@ REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'rest_framework.views.exception_handler'
 }
 
+# Default memory budget in bytes for a single reconciliation job. Jobs whose
+# estimated footprint exceeds it are reconciled with an on-disk strategy.
+RECONCILIATION_MEMORY_BUDGET = int(
+    os.getenv("RECONCILIATION_MEMORY_BUDGET", 512 * 1024 * 1024))
+
+# Admission control for reconciliations served by the API. Concurrent jobs are
+# limited by the total size of their input files; requests that do not fit wait
+# in a queue and are rejected with 429 when the queue is full or they time out.
+RECONCILIATION_MAX_CONCURRENT_BYTES = int(
+    os.getenv("RECONCILIATION_MAX_CONCURRENT_BYTES", 256 * 1024 * 1024))
+RECONCILIATION_MAX_QUEUED = int(os.getenv("RECONCILIATION_MAX_QUEUED", 16))
+RECONCILIATION_QUEUE_TIMEOUT = float(
+    os.getenv("RECONCILIATION_QUEUE_TIMEOUT", 30))
+RECONCILIATION_RETRY_AFTER = int(os.getenv("RECONCILIATION_RETRY_AFTER", 5))
+
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
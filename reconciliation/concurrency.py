@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import deque
+
+
+class ReconciliationOverloaded(Exception):
+    """
+    Raised when a reconciliation cannot be admitted because the queue is full or waiting timed out.
+    """
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key so only one of them runs the function and
+    the others wait for and share its result, or its exception.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, fn):
+        """
+        Run fn for key unless a call for key is already in progress, in which case wait for it.
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = {'done': threading.Event(), 'result': None, 'error': None}
+                self.calls[key] = call
+
+        if not leader:
+            call['done'].wait()
+        else:
+            try:
+                call['result'] = fn()
+            except BaseException as e:
+                call['error'] = e
+            finally:
+                with self.lock:
+                    del self.calls[key]
+                call['done'].set()
+
+        if call['error'] is not None:
+            raise call['error']
+        return call['result']
+
+
+class AdmissionController:
+    """
+    Limit concurrent reconciliations by the total bytes of their input files.
+
+    Requests that do not fit wait in a first-in first-out queue. When the queue already holds
+    max_queued requests, or a request waits longer than queue_timeout seconds, it is rejected
+    with ReconciliationOverloaded. A single request larger than max_bytes is admitted once
+    nothing else is running, so it is never starved.
+    """
+
+    def __init__(self, max_bytes: int, max_queued: int, queue_timeout: float, retry_after: int):
+        self.max_bytes = max_bytes
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.condition = threading.Condition()
+        self.queue = deque()
+        self.in_flight_bytes = 0
+        self.in_flight = 0
+
+    def fits(self, weight: int) -> bool:
+        return self.in_flight == 0 or self.in_flight_bytes + weight <= self.max_bytes
+
+    def acquire(self, weight: int) -> None:
+        """
+        Wait until weight bytes can be admitted, or raise ReconciliationOverloaded.
+        """
+        with self.condition:
+            if not self.queue and self.fits(weight):
+                self.admit(weight)
+                return
+            if len(self.queue) >= self.max_queued:
+                raise ReconciliationOverloaded(
+                    "Too many reconciliations in progress", self.retry_after)
+
+            ticket = object()
+            self.queue.append(ticket)
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while not (self.queue[0] is ticket and self.fits(weight)):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise ReconciliationOverloaded(
+                            "Timed out waiting for a reconciliation slot", self.retry_after)
+                    self.condition.wait(remaining)
+            finally:
+                self.queue.remove(ticket)
+                # Let the next request in line check whether it fits now.
+                self.condition.notify_all()
+            self.admit(weight)
+
+    def admit(self, weight: int) -> None:
+        self.in_flight_bytes += weight
+        self.in_flight += 1
+
+    def release(self, weight: int) -> None:
+        """
+        Release the bytes of a finished reconciliation and wake up queued requests.
+        """
+        with self.condition:
+            self.in_flight_bytes -= weight
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def run(self, weight: int, fn):
+        """
+        Run fn once weight bytes have been admitted.
+        """
+        self.acquire(weight)
+        try:
+            return fn()
+        finally:
+            self.release(weight)
@@ -0,0 +1,363 @@
+import csv
+import heapq
+import itertools
+import logging
+import os
+import sys
+import tempfile
+import zlib
+from django.conf import settings
+from reconciliation.utils import (
+    compare_records,
+    find_discrepancies,
+    find_missing_records,
+    normalize_data,
+    read_csv_headers,
+    reconcile_files,
+    sort_report,
+    validate_target_source_header,
+)
+
+
+logger = logging.getLogger(__name__)
+
+HASH_JOIN = 'hash_join'
+SORTED_MERGE = 'sorted_merge'
+PARTITIONED = 'partitioned'
+
+SAMPLE_ROWS = 1000
+MAX_PARTITIONS = 128
+MAX_MERGE_RUNS = 64
+MIN_CHUNK_ROWS = 1000
+# Bookkeeping cost of one entry in the dict that maps record ids to records.
+DICT_ENTRY_BYTES = 100
+
+
+def get_memory_budget(memory_budget: int | None = None) -> int:
+    """
+    Return the memory budget in bytes for a job, falling back to the configured default.
+    A job can lower its budget but never raise it above RECONCILIATION_MEMORY_BUDGET.
+    """
+    if memory_budget:
+        return min(memory_budget, settings.RECONCILIATION_MEMORY_BUDGET)
+    return settings.RECONCILIATION_MEMORY_BUDGET
+
+
+def estimate_file_memory(file_path: str, sample_size: int = SAMPLE_ROWS) -> dict:
+    """
+    Estimate the row count and in-memory footprint of a CSV file from a sample of its rows.
+
+    file_path: path to the CSV file
+    sample_size: number of rows to read for the estimate
+    """
+    file_size = os.path.getsize(file_path)
+    with open(file_path, mode='r', newline='', encoding='utf-8') as file:
+        reader = csv.DictReader(file)
+        headers = reader.fieldnames or []
+        header_bytes = len(','.join(headers).encode('utf-8')) + 1
+
+        sampled_rows, sampled_bytes, sampled_memory = 0, 0, 0
+        for row in itertools.islice(reader, sample_size):
+            normalized_row = normalize_data(row)
+            sampled_rows += 1
+            # Field values plus one separator per field (the last one being the newline).
+            sampled_bytes += sum(len(str(value).encode('utf-8'))
+                                 for value in row.values()) + len(row)
+            sampled_memory += sys.getsizeof(normalized_row) + DICT_ENTRY_BYTES + sum(
+                sys.getsizeof(value) for value in normalized_row.values())
+
+    if not sampled_rows:
+        return {'rows': 0, 'columns': len(headers), 'row_bytes': 0, 'memory': 0}
+
+    row_bytes = max(sampled_bytes // sampled_rows, 1)
+    row_memory = sampled_memory // sampled_rows
+    rows = max(sampled_rows, (file_size - header_bytes) // row_bytes)
+    return {
+        'rows': rows,
+        'columns': len(headers),
+        'row_bytes': row_bytes,
+        'memory': rows * row_memory,
+    }
+
+
+def plan_reconciliation(source_file: str, target_file: str, memory_budget: int | None = None) -> dict:
+    """
+    Pick the execution strategy for a reconciliation based on the estimated memory it needs.
+
+    The in-memory hash join is used when both files fit in the budget. Otherwise the files
+    are split into on-disk partitions small enough to join in memory, and when that would
+    need too many partitions the files are externally sorted and merged as streams.
+
+    The budget covers the join only. Every strategy returns the full report in memory, and
+    when the files barely overlap the report can be as large as both inputs together, which
+    is recorded in the plan as report_memory_bound. The sorted merge also never sorts fewer
+    than MIN_CHUNK_ROWS rows at a time, even when the budget is smaller than that.
+
+    source_file: path to the source CSV file
+    target_file: path to the target CSV file
+    memory_budget: memory budget in bytes, defaults to RECONCILIATION_MEMORY_BUDGET. It is
+        used as given, so budgets from untrusted clients go through get_memory_budget first.
+    """
+    memory_budget = memory_budget or settings.RECONCILIATION_MEMORY_BUDGET
+    source_estimate = estimate_file_memory(source_file)
+    target_estimate = estimate_file_memory(target_file)
+    estimated_memory = source_estimate['memory'] + target_estimate['memory']
+
+    plan = {
+        'strategy': HASH_JOIN,
+        'memory_budget': memory_budget,
+        'estimated_memory': estimated_memory,
+        'source_rows': source_estimate['rows'],
+        'target_rows': target_estimate['rows'],
+        'columns': source_estimate['columns'],
+        'report_memory_bound': estimated_memory,
+    }
+    if estimated_memory <= memory_budget:
+        return plan
+
+    partitions = -(-estimated_memory // memory_budget)
+    if partitions <= MAX_PARTITIONS:
+        plan['strategy'] = PARTITIONED
+        plan['partitions'] = partitions
+        return plan
+
+    plan['strategy'] = SORTED_MERGE
+    plan['chunk_rows'] = get_chunk_rows(plan)
+    return plan
+
+
+def get_chunk_rows(plan: dict) -> int:
+    """
+    Return how many rows the sorted merge can sort in memory at once within the plan's budget.
+    """
+    total_rows = max(plan['source_rows'] + plan['target_rows'], 1)
+    row_memory = max(plan['estimated_memory'] // total_rows, 1)
+    chunk_rows = plan['memory_budget'] // row_memory
+    if chunk_rows < MIN_CHUNK_ROWS:
+        logger.warning(
+            f"Memory budget of {plan['memory_budget']} bytes fits only {chunk_rows} rows, "
+            f"sorting chunks of {MIN_CHUNK_ROWS} rows instead.")
+        return MIN_CHUNK_ROWS
+    return chunk_rows
+
+
+def execute_plan(source_file: str, target_file: str, plan: dict) -> dict[str, list[dict]]:
+    """
+    Reconcile the source and target CSV files using the strategy chosen in the plan.
+
+    If the in-memory hash join runs out of memory, the reconciliation is retried as a
+    sorted streaming merge and the plan is updated to record the fallback.
+
+    source_file: path to the source CSV file
+    target_file: path to the target CSV file
+    plan: execution plan returned by plan_reconciliation
+    """
+    strategy = plan['strategy']
+    if strategy == PARTITIONED:
+        return reconcile_partitioned(source_file, target_file, plan['partitions'])
+    if strategy == SORTED_MERGE:
+        return reconcile_sorted_merge(source_file, target_file, plan['chunk_rows'])
+
+    try:
+        return reconcile_files(source_file, target_file)
+    except MemoryError:
+        logger.warning(
+            f"Hash join ran out of memory for {source_file} and {target_file}, "
+            f"falling back to sorted merge.")
+
+    # The fallback runs after the except block has exited, so the traceback and the
+    # partly built dictionaries held by its frames are released first.
+    plan['fallback_from'] = strategy
+    plan['strategy'] = SORTED_MERGE
+    plan.setdefault('chunk_rows', get_chunk_rows(plan))
+    return reconcile_sorted_merge(source_file, target_file, plan['chunk_rows'])
+
+
+def validate_file_headers(source_file: str, target_file: str) -> list[str]:
+    """
+    Validate that the source and target files share the same headers and return them.
+    """
+    source_headers = read_csv_headers(source_file)
+    target_headers = read_csv_headers(target_file)
+    validate_target_source_header(source_headers, target_headers)
+    return source_headers
+
+
+def iter_normalized_rows(file_path: str):
+    """
+    Yield the normalized rows of a CSV file one at a time.
+    """
+    with open(file_path, mode='r', newline='', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            yield normalize_data(row)
+
+
+def write_rows(file_path: str, headers: list[str], rows) -> None:
+    """
+    Write already normalized rows to a CSV spill file.
+    """
+    with open(file_path, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=headers)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def iter_spilled_rows(file_path: str):
+    """
+    Yield the rows of a CSV spill file as they were written.
+    """
+    with open(file_path, mode='r', newline='', encoding='utf-8') as file:
+        yield from csv.DictReader(file)
+
+
+def read_spilled_file(file_path: str, id_field: str) -> dict[str, dict]:
+    """
+    Read a CSV spill file into a dictionary keyed by id_field.
+    """
+    if not os.path.exists(file_path):
+        return {}
+    return {row[id_field]: row for row in iter_spilled_rows(file_path)}
+
+
+def reconcile_partitioned(source_file: str, target_file: str, partitions: int) -> dict[str, list[dict]]:
+    """
+    Reconcile the files by hash partitioning both of them on disk and joining each
+    partition in memory. The report is ordered by record id like reconcile_files.
+
+    source_file: path to the source CSV file
+    target_file: path to the target CSV file
+    partitions: number of partitions to split each file into
+    """
+    headers = validate_file_headers(source_file, target_file)
+    id_field = headers[0]
+
+    response_data = {
+        "missing_in_target": [],
+        "missing_in_source": [],
+        "discrepancies": [],
+    }
+    with tempfile.TemporaryDirectory(prefix='recon-') as spill_dir:
+        for name, file_path in (('source', source_file), ('target', target_file)):
+            partition_files, writers = [], []
+            try:
+                for index in range(partitions):
+                    partition_file = open(os.path.join(spill_dir, f'{name}-{index}.csv'),
+                                          mode='w', newline='', encoding='utf-8')
+                    partition_files.append(partition_file)
+                    writer = csv.DictWriter(partition_file, fieldnames=headers)
+                    writer.writeheader()
+                    writers.append(writer)
+
+                for row in iter_normalized_rows(file_path):
+                    index = zlib.crc32(row[id_field].encode('utf-8')) % partitions
+                    writers[index].writerow(row)
+            finally:
+                for partition_file in partition_files:
+                    partition_file.close()
+
+        for index in range(partitions):
+            source_dict = read_spilled_file(
+                os.path.join(spill_dir, f'source-{index}.csv'), id_field)
+            target_dict = read_spilled_file(
+                os.path.join(spill_dir, f'target-{index}.csv'), id_field)
+
+            response_data["missing_in_target"].extend(
+                find_missing_records(source_dict, target_dict))
+            response_data["missing_in_source"].extend(
+                find_missing_records(target_dict, source_dict))
+            response_data["discrepancies"].extend(
+                find_discrepancies(source_dict, target_dict))
+
+    return sort_report(response_data, id_field)
+
+
+def iter_sorted_rows(file_path: str, headers: list[str], chunk_rows: int, spill_dir: str, name: str):
+    """
+    Yield the normalized rows of a CSV file sorted by its id column, keeping only the last
+    row for each id like read_csv_file does.
+
+    The file is sorted in chunks of chunk_rows which are spilled to disk and merged back.
+    """
+    id_field = headers[0]
+    rows = iter_normalized_rows(file_path)
+    run_files = []
+    while True:
+        chunk = list(itertools.islice(rows, chunk_rows))
+        if not chunk:
+            break
+        chunk.sort(key=lambda row: row[id_field])
+        run_file = os.path.join(spill_dir, f'{name}-run-{len(run_files)}.csv')
+        write_rows(run_file, headers, chunk)
+        run_files.append(run_file)
+
+    # Merge runs in passes so no more than MAX_MERGE_RUNS files are open at once.
+    # heapq.merge is stable, so rows sharing an id keep their original file order.
+    merge_pass = 0
+    while len(run_files) > MAX_MERGE_RUNS:
+        merged_files = []
+        for start in range(0, len(run_files), MAX_MERGE_RUNS):
+            group_files = run_files[start:start + MAX_MERGE_RUNS]
+            merged_file = os.path.join(
+                spill_dir, f'{name}-merge-{merge_pass}-{len(merged_files)}.csv')
+            write_rows(merged_file, headers, heapq.merge(
+                *(iter_spilled_rows(run_file) for run_file in group_files),
+                key=lambda row: row[id_field]))
+            for run_file in group_files:
+                os.remove(run_file)
+            merged_files.append(merged_file)
+        run_files = merged_files
+        merge_pass += 1
+
+    merged = heapq.merge(*(iter_spilled_rows(run_file) for run_file in run_files),
+                         key=lambda row: row[id_field])
+    for _, group in itertools.groupby(merged, key=lambda row: row[id_field]):
+        for row in group:
+            pass
+        yield row
+
+
+def reconcile_sorted_merge(source_file: str, target_file: str, chunk_rows: int) -> dict[str, list[dict]]:
+    """
+    Reconcile the files by externally sorting both of them on the id column and merging
+    the two sorted streams, so only one chunk of rows is held in memory at a time.
+
+    source_file: path to the source CSV file
+    target_file: path to the target CSV file
+    chunk_rows: number of rows sorted in memory at once
+    """
+    headers = validate_file_headers(source_file, target_file)
+    id_field = headers[0]
+
+    missing_in_target, missing_in_source, discrepancies = [], [], []
+    with tempfile.TemporaryDirectory(prefix='recon-') as spill_dir:
+        source_rows = iter_sorted_rows(
+            source_file, headers, chunk_rows, spill_dir, 'source')
+        target_rows = iter_sorted_rows(
+            target_file, headers, chunk_rows, spill_dir, 'target')
+        source_record = next(source_rows, None)
+        target_record = next(target_rows, None)
+
+        while source_record is not None or target_record is not None:
+            if target_record is None or (
+                    source_record is not None and source_record[id_field] < target_record[id_field]):
+                missing_in_target.append(source_record)
+                source_record = next(source_rows, None)
+            elif source_record is None or target_record[id_field] < source_record[id_field]:
+                missing_in_source.append(target_record)
+                target_record = next(target_rows, None)
+            else:
+                discrepancy_details = compare_records(
+                    source_record, target_record)
+                if discrepancy_details:
+                    discrepancies.append({
+                        'id': source_record[id_field],
+                        'discrepancy_details': discrepancy_details
+                    })
+                source_record = next(source_rows, None)
+                target_record = next(target_rows, None)
+
+    return {
+        "missing_in_target": missing_in_target,
+        "missing_in_source": missing_in_source,
+        "discrepancies": discrepancies,
+    }
@@ -0,0 +1,204 @@
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import django
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from reconciliation.engine import execute_plan, plan_reconciliation
+from reconciliation.reports import REPORT_FORMATS, write_report
+
+
+def find_directory_pairs(directory: str) -> tuple[list[tuple[str, str, str]], list[str]]:
+    """
+    Pair the CSV files in the source/ and target/ subdirectories of directory by file name.
+
+    Returns the pairs and a list of errors for files that exist on only one side.
+    """
+    source_dir = os.path.join(directory, 'source')
+    target_dir = os.path.join(directory, 'target')
+    if not os.path.isdir(source_dir) or not os.path.isdir(target_dir):
+        raise CommandError(
+            f"{directory} must contain source/ and target/ subdirectories")
+
+    source_names = {file_name for file_name in os.listdir(source_dir)
+                    if file_name.endswith('.csv')}
+    target_names = {file_name for file_name in os.listdir(target_dir)
+                    if file_name.endswith('.csv')}
+
+    pairs, unmatched = [], []
+    for file_name in sorted(source_names | target_names):
+        if file_name not in target_names:
+            unmatched.append(f"No target file for {file_name}")
+        elif file_name not in source_names:
+            unmatched.append(f"No source file for {file_name}")
+        else:
+            pairs.append((os.path.splitext(file_name)[0],
+                          os.path.join(source_dir, file_name), os.path.join(target_dir, file_name)))
+    return pairs, unmatched
+
+
+def validate_report_name(name: str) -> None:
+    """
+    Make sure a report name cannot point outside the output directory.
+    """
+    separators = {'/', os.sep, os.altsep} - {None}
+    if name in ('', '.', '..') or any(separator in name for separator in separators):
+        raise CommandError(f"Invalid report name: {name!r}")
+
+
+def read_manifest_pairs(manifest: str) -> list[tuple[str, str, str]]:
+    """
+    Read source/target pairs from a CSV manifest with source, target and optional name columns.
+    Relative paths are resolved against the manifest's directory.
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest))
+    pairs = []
+    with open(manifest, mode='r', newline='', encoding='utf-8') as file:
+        reader = csv.DictReader(file)
+        if not {'source', 'target'}.issubset(reader.fieldnames or []):
+            raise CommandError(
+                f"Manifest {manifest} must have source and target columns")
+        for row in reader:
+            source_file = os.path.join(base_dir, row['source'])
+            target_file = os.path.join(base_dir, row['target'])
+            name = row.get('name') or os.path.splitext(
+                os.path.basename(source_file))[0]
+            validate_report_name(name)
+            pairs.append((name, source_file, target_file))
+    return pairs
+
+
+def setup_worker() -> None:
+    """
+    Make sure Django is configured in pool processes that were spawned rather than forked.
+    """
+    if not apps.ready:
+        django.setup()
+
+
+def reconcile_pair(name: str, source_file: str, target_file: str, output_dir: str,
+                   report_formats: list[str], memory_budget: int) -> dict:
+    """
+    Reconcile one source/target pair with the same engine as the API and write its reports.
+    """
+    started = time.perf_counter()
+    result = {
+        'name': name,
+        'bytes': os.path.getsize(source_file) + os.path.getsize(target_file),
+    }
+    try:
+        plan = plan_reconciliation(source_file, target_file, memory_budget)
+        response_data = execute_plan(source_file, target_file, plan)
+        for report_format in report_formats:
+            write_report(os.path.join(output_dir, f'{name}.{report_format}'),
+                         response_data, report_format)
+    except Exception as e:
+        result['error'] = str(e)
+    else:
+        result['strategy'] = plan['strategy']
+        result['missing_in_target'] = len(response_data['missing_in_target'])
+        result['missing_in_source'] = len(response_data['missing_in_source'])
+        result['discrepancies'] = len(response_data['discrepancies'])
+    result['seconds'] = time.perf_counter() - started
+    return result
+
+
+class Command(BaseCommand):
+    help = "Reconcile source/target CSV pairs from a directory or manifest and write the reports to disk."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input',
+            help="Directory with source/ and target/ subdirectories, or a CSV manifest with source and target columns.")
+        parser.add_argument(
+            '--output-dir', default='reports', help="Directory the reports are written to.")
+        parser.add_argument(
+            '--format', dest='formats', action='append', choices=REPORT_FORMATS,
+            help="Report format, may be given more than once. Defaults to json.")
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(), help="Number of worker processes.")
+        parser.add_argument(
+            '--memory-budget', type=int, default=None,
+            help="Memory budget in bytes per reconciliation, overriding RECONCILIATION_MEMORY_BUDGET in either direction.")
+
+    def handle(self, *args, **options):
+        input_path = options['input']
+        unmatched = []
+        if os.path.isdir(input_path):
+            pairs, unmatched = find_directory_pairs(input_path)
+        elif os.path.isfile(input_path):
+            pairs = read_manifest_pairs(input_path)
+        else:
+            raise CommandError(f"{input_path} does not exist")
+
+        names = [name for name, _, _ in pairs]
+        if len(names) != len(set(names)):
+            raise CommandError("Report names must be unique")
+        for _, source_file, target_file in pairs:
+            for file_path in (source_file, target_file):
+                if not os.path.isfile(file_path):
+                    raise CommandError(f"File not found: {file_path}")
+        if options['workers'] < 1:
+            raise CommandError("--workers must be at least 1")
+
+        output_dir = options['output_dir']
+        os.makedirs(output_dir, exist_ok=True)
+        report_formats = options['formats'] or ['json']
+        # The operator's flag is trusted, so unlike upload budgets it may exceed the setting.
+        memory_budget = options['memory_budget'] or settings.RECONCILIATION_MEMORY_BUDGET
+
+        # Files without a counterpart are reported as failures without stopping the batch.
+        for error in unmatched:
+            self.stderr.write(error)
+
+        started = time.perf_counter()
+        results = []
+        with ProcessPoolExecutor(max_workers=min(options['workers'], max(len(pairs), 1)),
+                                 initializer=setup_worker) as executor:
+            futures = []
+            for name, source_file, target_file in pairs:
+                try:
+                    future = executor.submit(reconcile_pair, name, source_file, target_file,
+                                             output_dir, report_formats, memory_budget)
+                except Exception as e:
+                    future = e
+                futures.append((name, source_file, target_file, future))
+
+            for name, source_file, target_file, future in futures:
+                try:
+                    if isinstance(future, Exception):
+                        raise future
+                    result = future.result()
+                except Exception as e:
+                    # A worker killed by the OS (e.g. out of memory) breaks the whole
+                    # pool; record its pairs as failed and keep reporting the others.
+                    result = {
+                        'name': name,
+                        'bytes': os.path.getsize(source_file) + os.path.getsize(target_file),
+                        'error': str(e) or e.__class__.__name__,
+                        'seconds': 0,
+                    }
+                results.append(result)
+                if 'error' in result:
+                    self.stderr.write(f"{result['name']}: {result['error']}")
+                else:
+                    self.stdout.write(
+                        f"{result['name']}: {result['strategy']}, "
+                        f"{result['missing_in_target']} missing in target, "
+                        f"{result['missing_in_source']} missing in source, "
+                        f"{result['discrepancies']} discrepancies "
+                        f"in {result['seconds']:.2f}s")
+        elapsed = time.perf_counter() - started
+
+        failed = sum(1 for result in results if 'error' in result)
+        total_mb = sum(result['bytes'] for result in results) / (1024 * 1024)
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciled {len(results) - failed}/{len(results) + len(unmatched)} pairs "
+            f"({total_mb:.2f} MB) in {elapsed:.2f}s: "
+            f"{len(results) / elapsed if elapsed else 0:.2f} pairs/s, "
+            f"{total_mb / elapsed if elapsed else 0:.2f} MB/s"))
+        failed += len(unmatched)
+        if failed:
+            raise CommandError(f"{failed} pair(s) failed to reconcile")
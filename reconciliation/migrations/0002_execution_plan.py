@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-19 15:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reconciliation", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reconciliationfile",
+            name="execution_plan",
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="reconciliationfile",
+            name="memory_budget",
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.2 on 2026-10-19 15:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reconciliation", "0002_execution_plan"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReconciliationRun",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+                ("strategy", models.CharField(blank=True, max_length=32)),
+                ("missing_in_target_count", models.PositiveIntegerField(default=0)),
+                ("missing_in_source_count", models.PositiveIntegerField(default=0)),
+                ("discrepancy_count", models.PositiveIntegerField(default=0)),
+                ("reconciliation_file", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="runs", to="reconciliation.reconciliationfile")),
+            ],
+        ),
+        migrations.CreateModel(
+            name="MissingRecord",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("missing_in", models.CharField(choices=[("target", "Missing in target"), ("source", "Missing in source")], max_length=6)),
+                ("record_id", models.CharField(max_length=255)),
+                ("record", models.JSONField()),
+                ("run", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="missing_records", to="reconciliation.reconciliationrun")),
+            ],
+            options={
+                "indexes": [models.Index(fields=["run", "missing_in"], name="reconciliat_run_id_67f2e1_idx"), models.Index(fields=["record_id"], name="reconciliat_record__e6f849_idx")],
+            },
+        ),
+        migrations.CreateModel(
+            name="FieldDiscrepancy",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("record_id", models.CharField(max_length=255)),
+                ("field", models.CharField(max_length=255)),
+                ("source_value", models.TextField(blank=True)),
+                ("target_value", models.TextField(blank=True)),
+                ("run", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="discrepancies", to="reconciliation.reconciliationrun")),
+            ],
+            options={
+                "indexes": [models.Index(fields=["run", "field"], name="reconciliat_run_id_53fb4b_idx"), models.Index(fields=["field", "record_id"], name="reconciliat_field_a12576_idx"), models.Index(fields=["record_id"], name="reconciliat_record__7e37cb_idx")],
+            },
+        ),
+    ]
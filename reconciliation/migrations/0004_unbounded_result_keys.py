@@ -0,0 +1,28 @@
+# Generated by Django 5.1.2 on 2026-10-19 15:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reconciliation", "0003_result_store"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="fielddiscrepancy",
+            name="field",
+            field=models.TextField(),
+        ),
+        migrations.AlterField(
+            model_name="fielddiscrepancy",
+            name="record_id",
+            field=models.TextField(),
+        ),
+        migrations.AlterField(
+            model_name="missingrecord",
+            name="record_id",
+            field=models.TextField(),
+        ),
+    ]
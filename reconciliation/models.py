@@ -5,3 +5,52 @@ class ReconciliationFile(models.Model):
     source_file = models.FileField(upload_to='uploads/')
     target_file = models.FileField(upload_to='uploads/')
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    memory_budget = models.PositiveBigIntegerField(null=True, blank=True)
+    execution_plan = models.JSONField(null=True, blank=True)
+
+
+class ReconciliationRun(models.Model):
+    reconciliation_file = models.ForeignKey(
+        ReconciliationFile, related_name='runs', on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    strategy = models.CharField(max_length=32, blank=True)
+    missing_in_target_count = models.PositiveIntegerField(default=0)
+    missing_in_source_count = models.PositiveIntegerField(default=0)
+    discrepancy_count = models.PositiveIntegerField(default=0)
+
+
+class MissingRecord(models.Model):
+    MISSING_IN_TARGET = 'target'
+    MISSING_IN_SOURCE = 'source'
+    MISSING_IN_CHOICES = [
+        (MISSING_IN_TARGET, 'Missing in target'),
+        (MISSING_IN_SOURCE, 'Missing in source'),
+    ]
+
+    run = models.ForeignKey(
+        ReconciliationRun, related_name='missing_records', on_delete=models.CASCADE)
+    missing_in = models.CharField(max_length=6, choices=MISSING_IN_CHOICES)
+    record_id = models.TextField()
+    record = models.JSONField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['run', 'missing_in']),
+            models.Index(fields=['record_id']),
+        ]
+
+
+class FieldDiscrepancy(models.Model):
+    run = models.ForeignKey(
+        ReconciliationRun, related_name='discrepancies', on_delete=models.CASCADE)
+    record_id = models.TextField()
+    field = models.TextField()
+    source_value = models.TextField(blank=True)
+    target_value = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['run', 'field']),
+            models.Index(fields=['field', 'record_id']),
+            models.Index(fields=['record_id']),
+        ]
@@ -0,0 +1,68 @@
+import csv
+import json
+from django.template.loader import render_to_string
+
+
+REPORT_FORMATS = ['json', 'csv', 'html']
+
+
+def write_missing_records_section(writer, section_title: str, missing_records: list[dict]) -> None:
+    """
+    Write a CSV section for missing records (either in target or source).
+    """
+    writer.writerow([section_title])
+    writer.writerow(['ID', 'Name', 'Date', 'Amount'])
+    for record in missing_records:
+        writer.writerow([record.get('ID'), record.get(
+            'Name'), record.get('Date'), record.get('Amount')])
+    writer.writerow([])
+
+
+def write_discrepancies_section(writer, discrepancies: list[dict]) -> None:
+    """
+    Write a CSV section for discrepancy records
+    """
+    writer.writerow(['Discrepancies'])
+    writer.writerow(['ID', 'Field', 'Source Value', 'Target Value'])
+    for discrepancy in discrepancies:
+        discrepancy_id = discrepancy['id']
+        for detail in discrepancy['discrepancy_details']:
+            writer.writerow([
+                discrepancy_id,
+                detail['field'],
+                detail['source_value'],
+                detail['target_value']
+            ])
+
+
+def write_csv_report(stream, response_data: dict[str, list[dict]]) -> None:
+    """
+    Write the report as CSV sections for missing records and discrepancies.
+
+    stream: file-like object to write to
+    response_data: report returned by the reconciliation engine
+    """
+    writer = csv.writer(stream)
+    write_missing_records_section(
+        writer, 'Missing in Target', response_data.get('missing_in_target', []))
+    write_missing_records_section(
+        writer, 'Missing in Source', response_data.get('missing_in_source', []))
+    write_discrepancies_section(
+        writer, response_data.get('discrepancies', []))
+
+
+def write_report(file_path: str, response_data: dict[str, list[dict]], report_format: str) -> None:
+    """
+    Write the report to file_path in one of REPORT_FORMATS.
+    """
+    if report_format not in REPORT_FORMATS:
+        raise ValueError(f"Unsupported report format: {report_format}")
+
+    with open(file_path, mode='w', newline='', encoding='utf-8') as file:
+        if report_format == 'csv':
+            write_csv_report(file, response_data)
+        elif report_format == 'html':
+            file.write(render_to_string(
+                'reconciliation_report.html', response_data))
+        else:
+            json.dump(response_data, file)
@@ -1,8 +1,25 @@
 from rest_framework import serializers
-from .models import ReconciliationFile
+from .models import FieldDiscrepancy, MissingRecord, ReconciliationFile
 
 
 class ReconciliationFileSerializer(serializers.ModelSerializer):
     class Meta:
         model = ReconciliationFile
-        fields = ['source_file', 'target_file']
+        fields = ['source_file', 'target_file', 'memory_budget']
+
+
+class MissingRecordSerializer(serializers.ModelSerializer):
+    run_created_at = serializers.DateTimeField(source='run.created_at', read_only=True)
+
+    class Meta:
+        model = MissingRecord
+        fields = ['run', 'run_created_at', 'missing_in', 'record_id', 'record']
+
+
+class FieldDiscrepancySerializer(serializers.ModelSerializer):
+    run_created_at = serializers.DateTimeField(source='run.created_at', read_only=True)
+
+    class Meta:
+        model = FieldDiscrepancy
+        fields = ['run', 'run_created_at', 'record_id',
+                  'field', 'source_value', 'target_value']
@@ -0,0 +1,172 @@
+import itertools
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from reconciliation.models import FieldDiscrepancy, MissingRecord, ReconciliationRun
+
+
+BULK_INSERT_BATCH_SIZE = 1000
+SUMMARY_GROUPS = {
+    'field': 'field',
+    'key': 'record_id',
+    'run': 'run',
+}
+
+
+def bulk_insert(model, objects, batch_size: int = BULK_INSERT_BATCH_SIZE) -> None:
+    """
+    Insert model instances produced by an iterable in batches of batch_size, so the
+    whole result set is never materialized as model instances at once.
+    """
+    objects = iter(objects)
+    while True:
+        batch = list(itertools.islice(objects, batch_size))
+        if not batch:
+            break
+        model.objects.bulk_create(batch, batch_size=batch_size)
+
+
+def save_reconciliation_run(reconciliation_file, plan: dict, response_data: dict[str, list[dict]]) -> ReconciliationRun:
+    """
+    Persist the output of a reconciliation as a run with its missing records and
+    per-field discrepancies.
+
+    reconciliation_file: the ReconciliationFile that was reconciled
+    plan: execution plan the reconciliation ran with
+    response_data: report returned by the reconciliation engine
+    """
+    missing_in_target = response_data.get('missing_in_target', [])
+    missing_in_source = response_data.get('missing_in_source', [])
+    discrepancies = response_data.get('discrepancies', [])
+
+    with transaction.atomic():
+        run = ReconciliationRun.objects.create(
+            reconciliation_file=reconciliation_file,
+            strategy=plan.get('strategy', ''),
+            missing_in_target_count=len(missing_in_target),
+            missing_in_source_count=len(missing_in_source),
+            discrepancy_count=len(discrepancies),
+        )
+        # Records are keyed by their first column, as in read_csv_file.
+        bulk_insert(MissingRecord, itertools.chain(
+            (MissingRecord(run=run, missing_in=MissingRecord.MISSING_IN_TARGET,
+                           record_id=next(iter(record.values()), ''), record=record)
+             for record in missing_in_target),
+            (MissingRecord(run=run, missing_in=MissingRecord.MISSING_IN_SOURCE,
+                           record_id=next(iter(record.values()), ''), record=record)
+             for record in missing_in_source),
+        ))
+        bulk_insert(FieldDiscrepancy, (
+            FieldDiscrepancy(run=run, record_id=discrepancy['id'], field=detail['field'],
+                             source_value=detail['source_value'], target_value=detail['target_value'])
+            for discrepancy in discrepancies
+            for detail in discrepancy['discrepancy_details']
+        ))
+
+    return run
+
+
+def load_report(run: ReconciliationRun) -> dict[str, list[dict]]:
+    """
+    Rebuild the report of a stored run in the same shape the reconciliation engine returns.
+    """
+    missing_records = run.missing_records.order_by('id')
+    missing_in_target = [missing.record for missing in missing_records.filter(
+        missing_in=MissingRecord.MISSING_IN_TARGET)]
+    missing_in_source = [missing.record for missing in missing_records.filter(
+        missing_in=MissingRecord.MISSING_IN_SOURCE)]
+
+    discrepancies = []
+    for record_id, details in itertools.groupby(
+            run.discrepancies.order_by('id').iterator(), key=lambda discrepancy: discrepancy.record_id):
+        discrepancies.append({
+            'id': record_id,
+            'discrepancy_details': [{
+                'field': detail.field,
+                'source_value': detail.source_value,
+                'target_value': detail.target_value
+            } for detail in details]
+        })
+
+    return {
+        "missing_in_target": missing_in_target,
+        "missing_in_source": missing_in_source,
+        "discrepancies": discrepancies,
+    }
+
+
+def parse_since_until(value: str):
+    """
+    Parse a date or datetime query parameter.
+    """
+    try:
+        parsed = parse_date(value) or parse_datetime(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValueError(f"Invalid date: {value}")
+    if hasattr(parsed, 'hour') and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def filter_results(queryset, query_params):
+    """
+    Filter a queryset of stored results by run, reconciliation file, field, key and run date.
+
+    queryset: MissingRecord or FieldDiscrepancy queryset
+    query_params: request query parameters
+    """
+    filters = {}
+    for param, lookup in (('run', 'run_id'), ('file', 'run__reconciliation_file_id')):
+        value = query_params.get(param)
+        if value:
+            if not value.isdigit():
+                raise ValueError(f"Invalid {param}: {value}")
+            filters[lookup] = value
+    if query_params.get('key'):
+        filters['record_id'] = query_params['key']
+    if query_params.get('field') and queryset.model is FieldDiscrepancy:
+        filters['field'] = query_params['field']
+    if query_params.get('missing_in') and queryset.model is MissingRecord:
+        filters['missing_in'] = query_params['missing_in']
+    for param, lookup in (('since', 'gte'), ('until', 'lte')):
+        value = query_params.get(param)
+        if value:
+            value = parse_since_until(value)
+            # Plain dates are compared against the day the run was created.
+            if hasattr(value, 'hour'):
+                filters[f'run__created_at__{lookup}'] = value
+            else:
+                filters[f'run__created_at__date__{lookup}'] = value
+
+    return queryset.filter(**filters)
+
+
+def summarize_discrepancies(queryset, group_by: str = 'field') -> list[dict]:
+    """
+    Aggregate discrepancies across runs, grouped by field, key or run.
+
+    queryset: filtered FieldDiscrepancy queryset
+    group_by: one of 'field', 'key' or 'run'
+    """
+    if group_by not in SUMMARY_GROUPS:
+        raise ValueError(
+            f"Invalid group_by: {group_by}, expected one of {', '.join(SUMMARY_GROUPS)}")
+
+    column = SUMMARY_GROUPS[group_by]
+    rows = queryset.values(column).annotate(
+        discrepancies=Count('id'),
+        runs=Count('run', distinct=True),
+        keys=Count('record_id', distinct=True),
+        fields=Count('field', distinct=True),
+    ).order_by('-discrepancies', column)
+
+    return [{
+        group_by: row[column],
+        'discrepancies': row['discrepancies'],
+        'runs': row['runs'],
+        'keys': row['keys'],
+        'fields': row['fields'],
+    } for row in rows]
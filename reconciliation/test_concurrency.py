@@ -0,0 +1,102 @@
+import threading
+import time
+import unittest
+from .concurrency import AdmissionController, ReconciliationOverloaded, SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_concurrent_calls_share_result(self):
+        single_flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls, results = [], []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return 'report'
+
+        def request():
+            results.append(single_flight.do(1, compute))
+
+        leader = threading.Thread(target=request)
+        leader.start()
+        started.wait()
+        followers = [threading.Thread(target=request) for _ in range(5)]
+        for follower in followers:
+            follower.start()
+        # Give the followers time to join the flight before it completes.
+        time.sleep(0.05)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['report'] * 6)
+
+    def test_error_is_shared_and_cleared(self):
+        single_flight = SingleFlight()
+
+        def fail():
+            raise ValueError("bad headers")
+
+        with self.assertRaises(ValueError):
+            single_flight.do(1, fail)
+        self.assertEqual(single_flight.do(1, lambda: 'report'), 'report')
+        self.assertEqual(single_flight.calls, {})
+
+
+class TestAdmissionController(unittest.TestCase):
+
+    def test_admits_within_capacity(self):
+        controller = AdmissionController(
+            max_bytes=100, max_queued=1, queue_timeout=1, retry_after=5)
+        controller.acquire(60)
+        controller.acquire(40)
+        self.assertEqual(controller.in_flight_bytes, 100)
+        controller.release(60)
+        controller.release(40)
+        self.assertEqual(controller.in_flight_bytes, 0)
+
+    def test_oversized_request_runs_alone(self):
+        controller = AdmissionController(
+            max_bytes=100, max_queued=1, queue_timeout=1, retry_after=5)
+        self.assertEqual(controller.run(500, lambda: 'report'), 'report')
+        self.assertEqual(controller.in_flight, 0)
+
+    def test_rejects_when_queue_is_full(self):
+        controller = AdmissionController(
+            max_bytes=100, max_queued=0, queue_timeout=1, retry_after=7)
+        controller.acquire(100)
+        with self.assertRaises(ReconciliationOverloaded) as context:
+            controller.acquire(10)
+        self.assertEqual(context.exception.retry_after, 7)
+
+    def test_rejects_after_queue_timeout(self):
+        controller = AdmissionController(
+            max_bytes=100, max_queued=1, queue_timeout=0.05, retry_after=5)
+        controller.acquire(100)
+        with self.assertRaises(ReconciliationOverloaded):
+            controller.acquire(10)
+        self.assertEqual(len(controller.queue), 0)
+
+    def test_queued_request_runs_after_release(self):
+        controller = AdmissionController(
+            max_bytes=100, max_queued=1, queue_timeout=5, retry_after=5)
+        controller.acquire(100)
+        results = []
+        waiter = threading.Thread(
+            target=lambda: results.append(controller.run(50, lambda: 'report')))
+        waiter.start()
+        time.sleep(0.05)
+        self.assertEqual(results, [])
+
+        controller.release(100)
+        waiter.join()
+        self.assertEqual(results, ['report'])
+        self.assertEqual(controller.in_flight_bytes, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
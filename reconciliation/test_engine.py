@@ -0,0 +1,189 @@
+import os
+import tempfile
+import unittest
+import weakref
+from random import Random
+from unittest.mock import patch
+from django.test import SimpleTestCase, override_settings
+from .engine import (
+    HASH_JOIN,
+    MIN_CHUNK_ROWS,
+    PARTITIONED,
+    SORTED_MERGE,
+    estimate_file_memory,
+    execute_plan,
+    get_memory_budget,
+    plan_reconciliation,
+    reconcile_partitioned,
+    reconcile_sorted_merge,
+)
+from .utils import normalize_data, reconcile_files
+
+
+class TrackedRecord(dict):
+    """
+    Dict that can be weakly referenced, to check when normalized rows are freed.
+    """
+
+
+SOURCE_CSV = (
+    "ID,Name,Date,Amount\n"
+    "003,Alice Brown,2023-01-03,300.00\n"
+    "001,John Doe,2023-01-01,100.00\n"
+    "002,Jane Smith,2023-01-02,200.00\n"
+    "004,Bob Stone,2023-01-04,400.00\n"
+    "001,John Doe,2023-01-01,120.00\n"
+)
+TARGET_CSV = (
+    "ID,Name,Date,Amount\n"
+    "002,Jane Doe,2023-01-02,200.00\n"
+    "001,John Doe,2023-01-01,150.00\n"
+    "005,Eve Black,2023-01-05,500.00\n"
+    "003,Alice Brown,2023-01-03,300.00\n"
+)
+
+
+class TestEngine(SimpleTestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.source_file = self.write_file('source.csv', SOURCE_CSV)
+        self.target_file = self.write_file('target.csv', TARGET_CSV)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_file(self, name, content):
+        file_path = os.path.join(self.temp_dir.name, name)
+        with open(file_path, mode='w', newline='', encoding='utf-8') as file:
+            file.write(content)
+        return file_path
+
+    def test_estimate_file_memory(self):
+        estimate = estimate_file_memory(self.source_file)
+        self.assertEqual(estimate['rows'], 5)
+        self.assertEqual(estimate['columns'], 4)
+        self.assertGreater(estimate['memory'], 0)
+
+        empty_file = self.write_file('empty.csv', "ID,Name,Date,Amount\n")
+        self.assertEqual(estimate_file_memory(empty_file)['memory'], 0)
+
+    def test_plan_reconciliation(self):
+        plan = plan_reconciliation(
+            self.source_file, self.target_file, 1024 * 1024)
+        self.assertEqual(plan['strategy'], HASH_JOIN)
+        self.assertEqual(plan['source_rows'], 5)
+        self.assertEqual(plan['target_rows'], 4)
+
+        plan = plan_reconciliation(
+            self.source_file, self.target_file, plan['estimated_memory'] // 2)
+        self.assertEqual(plan['strategy'], PARTITIONED)
+        self.assertIn(plan['partitions'], (2, 3))
+
+        with self.assertLogs('reconciliation.engine', 'WARNING') as logs:
+            plan = plan_reconciliation(self.source_file, self.target_file, 1)
+        self.assertEqual(plan['strategy'], SORTED_MERGE)
+        self.assertEqual(plan['chunk_rows'], MIN_CHUNK_ROWS)
+        self.assertIn('sorting chunks of', logs.output[0])
+        self.assertEqual(plan['report_memory_bound'], plan['estimated_memory'])
+
+    @override_settings(RECONCILIATION_MEMORY_BUDGET=1)
+    def test_plan_reconciliation_default_budget(self):
+        plan = plan_reconciliation(self.source_file, self.target_file)
+        self.assertEqual(plan['memory_budget'], 1)
+        self.assertEqual(plan['strategy'], SORTED_MERGE)
+
+    @override_settings(RECONCILIATION_MEMORY_BUDGET=1)
+    def test_get_memory_budget_clamps_job_budget(self):
+        self.assertEqual(get_memory_budget(10**15), 1)
+        plan = plan_reconciliation(
+            self.source_file, self.target_file, get_memory_budget(10**15))
+        self.assertEqual(plan['memory_budget'], 1)
+        self.assertEqual(plan['strategy'], SORTED_MERGE)
+
+    @override_settings(RECONCILIATION_MEMORY_BUDGET=1)
+    def test_plan_reconciliation_uses_given_budget(self):
+        plan = plan_reconciliation(self.source_file, self.target_file, 10**15)
+        self.assertEqual(plan['memory_budget'], 10**15)
+        self.assertEqual(plan['strategy'], HASH_JOIN)
+
+    def test_strategies_match_hash_join(self):
+        expected = reconcile_files(self.source_file, self.target_file)
+
+        for partitions in (1, 3):
+            self.assertEqual(reconcile_partitioned(
+                self.source_file, self.target_file, partitions), expected)
+        for chunk_rows in (1, 2, 100):
+            self.assertEqual(reconcile_sorted_merge(
+                self.source_file, self.target_file, chunk_rows), expected)
+
+    def test_strategies_match_on_random_files(self):
+        random = Random(42)
+        headers = "ID,Name,Amount\n"
+        source_rows = [f"{random.randrange(700):04d},Name {random.randrange(3)},{random.randrange(5)}\n"
+                       for _ in range(500)]
+        target_rows = [f"{random.randrange(700):04d},Name {random.randrange(3)},{random.randrange(5)}\n"
+                       for _ in range(500)]
+        source_file = self.write_file('random_source.csv', headers + ''.join(source_rows))
+        target_file = self.write_file('random_target.csv', headers + ''.join(target_rows))
+
+        expected = reconcile_files(source_file, target_file)
+        self.assertEqual(reconcile_partitioned(
+            source_file, target_file, 7), expected)
+        self.assertEqual(reconcile_sorted_merge(
+            source_file, target_file, 64), expected)
+
+    @patch('reconciliation.engine.MAX_MERGE_RUNS', 2)
+    def test_sorted_merge_multiple_passes(self):
+        expected = reconcile_files(self.source_file, self.target_file)
+        self.assertEqual(reconcile_sorted_merge(
+            self.source_file, self.target_file, 1), expected)
+
+    def test_streaming_strategies_validate_headers(self):
+        target_file = self.write_file(
+            'bad_target.csv', "ID,Name,Amount\n001,John Doe,100.00\n")
+        with self.assertRaises(ValueError):
+            reconcile_partitioned(self.source_file, target_file, 2)
+        with self.assertRaises(ValueError):
+            reconcile_sorted_merge(self.source_file, target_file, 2)
+
+    @patch('reconciliation.engine.reconcile_files', side_effect=MemoryError)
+    def test_execute_plan_falls_back_on_memory_error(self, mock_reconcile):
+        plan = plan_reconciliation(
+            self.source_file, self.target_file, 1024 * 1024)
+        response = execute_plan(self.source_file, self.target_file, plan)
+
+        self.assertEqual(plan['strategy'], SORTED_MERGE)
+        self.assertEqual(plan['fallback_from'], HASH_JOIN)
+        self.assertEqual(len(response["missing_in_target"]), 1)
+        self.assertEqual(len(response["missing_in_source"]), 1)
+        self.assertEqual(len(response["discrepancies"]), 2)
+
+    def test_execute_plan_releases_partial_dicts_before_fallback(self):
+        records = []
+
+        def normalize_until_out_of_memory(record):
+            if len(records) == 3:
+                raise MemoryError
+            normalized_row = TrackedRecord(normalize_data(record))
+            records.append(weakref.ref(normalized_row))
+            return normalized_row
+
+        def check_released_then_merge(source_file, target_file, chunk_rows):
+            self.assertEqual(len(records), 3)
+            self.assertEqual([record() for record in records], [None] * 3)
+            return reconcile_sorted_merge(source_file, target_file, chunk_rows)
+
+        plan = plan_reconciliation(
+            self.source_file, self.target_file, 1024 * 1024)
+        with patch('reconciliation.utils.normalize_data', normalize_until_out_of_memory), \
+                patch('reconciliation.engine.reconcile_sorted_merge', side_effect=check_released_then_merge):
+            response = execute_plan(self.source_file, self.target_file, plan)
+
+        self.assertEqual(plan['fallback_from'], HASH_JOIN)
+        self.assertEqual(response, reconcile_files(
+            self.source_file, self.target_file))
+
+
+if __name__ == "__main__":
+    unittest.main()
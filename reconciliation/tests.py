@@ -1,7 +1,22 @@
+import json
+import os
+import tempfile
+import threading
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+from django.db import connection
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APIClient, APITestCase, APITransactionTestCase
 from django.core.files.uploadedfile import SimpleUploadedFile
+from reconciliation.concurrency import AdmissionController
+from reconciliation.engine import execute_plan
+from reconciliation.views import FileReconciliationView
+from reconciliation.utils import reconcile_files
+from reconciliation.models import ReconciliationFile, ReconciliationRun, MissingRecord, FieldDiscrepancy
 
 
 class FileUploadViewTests(APITestCase):
@@ -52,6 +67,60 @@ class FileUploadViewTests(APITestCase):
         self.assertIn('missing_in_source', response.data['report'])
         self.assertIn('discrepancies', response.data['report'])
 
+    def test_get_reconciliation_records_plan(self):
+        upload_response = self.client.post(self.upload_url, {
+            'source_file': self.test_source_file,
+            'target_file': self.test_target_file,
+            'memory_budget': 1,
+        }, format='multipart')
+
+        file_id = upload_response.data['id']
+        response = self.client.get(
+            reverse('reconcile-files', args=[file_id]), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['report']['discrepancies']), 1)
+        execution_plan = ReconciliationFile.objects.get(
+            id=file_id).execution_plan
+        self.assertEqual(execution_plan['strategy'], 'sorted_merge')
+        self.assertEqual(execution_plan['memory_budget'], 1)
+
+    @override_settings(RECONCILIATION_MEMORY_BUDGET=1)
+    def test_get_reconciliation_clamps_upload_budget(self):
+        upload_response = self.client.post(self.upload_url, {
+            'source_file': self.test_source_file,
+            'target_file': self.test_target_file,
+            'memory_budget': 10**15,
+        }, format='multipart')
+
+        file_id = upload_response.data['id']
+        response = self.client.get(
+            reverse('reconcile-files', args=[file_id]), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        execution_plan = ReconciliationFile.objects.get(
+            id=file_id).execution_plan
+        self.assertEqual(execution_plan['memory_budget'], 1)
+        self.assertEqual(execution_plan['strategy'], 'sorted_merge')
+
+    def test_get_reconciliation_overloaded(self):
+        upload_response = self.client.post(self.upload_url, {
+            'source_file': self.test_source_file,
+            'target_file': self.test_target_file,
+        }, format='multipart')
+        controller = AdmissionController(
+            max_bytes=1, max_queued=0, queue_timeout=1, retry_after=7)
+        controller.acquire(1)
+
+        with patch('reconciliation.views.admission_controller', controller):
+            response = self.client.get(
+                reverse('reconcile-files', args=[upload_response.data['id']]), format='json')
+
+        self.assertEqual(response.status_code,
+                         status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '7')
+        self.assertIn('error', response.data)
+
     def test_get_reconciliation_file_not_found(self):
         response = self.client.get(
             reverse('reconcile-files', args=[999]), format='json')  # Non-existent ID
@@ -61,3 +130,312 @@ class FileUploadViewTests(APITestCase):
 
     def tearDown(self):
         pass
+
+
+class ResultStoreTests(APITestCase):
+    def setUp(self):
+        upload_response = self.client.post(reverse('file-upload'), {
+            'source_file': SimpleUploadedFile(
+                'source.csv',
+                b'ID,Name,Date,Amount\n001,John Doe,2023-01-01,100.00\n002,Jane Smith,2023-01-02,200.00\n003,Bob Stone,2023-01-03,300.00'
+            ),
+            'target_file': SimpleUploadedFile(
+                'target.csv',
+                b'ID,Name,Date,Amount\n001,John Doe,2023-01-01,150.00\n002,Jane Doe,2023-01-02,250.00\n004,Eve Black,2023-01-04,400.00'
+            ),
+        }, format='multipart')
+        self.file_id = upload_response.data['id']
+        self.reconcile_url = reverse('reconcile-files', args=[self.file_id])
+
+    def test_reconciliation_persists_run(self):
+        response = self.client.get(self.reconcile_url, format='json')
+
+        run = ReconciliationRun.objects.get(id=response.data['run'])
+        self.assertEqual(run.reconciliation_file_id, self.file_id)
+        self.assertEqual(run.missing_in_target_count, 1)
+        self.assertEqual(run.missing_in_source_count, 1)
+        self.assertEqual(run.discrepancy_count, 2)
+        self.assertEqual(run.discrepancies.count(), 3)
+
+    def test_reconciliation_serves_latest_run(self):
+        first_response = self.client.get(self.reconcile_url, format='json')
+
+        with patch('reconciliation.views.execute_plan') as mock_execute:
+            response = self.client.get(self.reconcile_url, format='json')
+
+        mock_execute.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['run'], first_response.data['run'])
+        self.assertEqual(response.data['report'],
+                         first_response.data['report'])
+        self.assertEqual(ReconciliationRun.objects.count(), 1)
+
+    def test_reconciliation_refresh(self):
+        first_run = self.client.get(self.reconcile_url).data['run']
+
+        response = self.client.get(self.reconcile_url, {'refresh': 'true'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.data['run'], first_run)
+        self.assertEqual(self.client.get(self.reconcile_url).data['run'],
+                         response.data['run'])
+
+    def test_reconciliation_stores_long_keys(self):
+        long_id, long_field = 'x' * 1000, 'Field' * 100
+        upload_response = self.client.post(reverse('file-upload'), {
+            'source_file': SimpleUploadedFile(
+                'source.csv', f'ID,{long_field}\n{long_id},a\n001,b'.encode()),
+            'target_file': SimpleUploadedFile(
+                'target.csv', f'ID,{long_field}\n{long_id},c'.encode()),
+        }, format='multipart')
+
+        response = self.client.get(
+            reverse('reconcile-files', args=[upload_response.data['id']]), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for model in (MissingRecord, FieldDiscrepancy):
+            self.assertIsNone(model._meta.get_field('record_id').max_length)
+        self.assertIsNone(FieldDiscrepancy._meta.get_field('field').max_length)
+        discrepancy = FieldDiscrepancy.objects.get(record_id=long_id)
+        self.assertEqual(discrepancy.field, long_field)
+        response = self.client.get(
+            reverse('field-discrepancies'), {'key': long_id, 'field': long_field})
+        self.assertEqual(response.data['count'], 1)
+
+    def test_get_stored_run(self):
+        reconcile_response = self.client.get(self.reconcile_url, format='json')
+
+        response = self.client.get(
+            reverse('reconciliation-run', args=[reconcile_response.data['run']]), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['report'],
+                         reconcile_response.data['report'])
+
+    def test_get_stored_run_not_found(self):
+        response = self.client.get(
+            reverse('reconciliation-run', args=[999]), format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_filter_discrepancies(self):
+        first_run = self.client.get(self.reconcile_url).data['run']
+        self.client.get(self.reconcile_url, {'refresh': 'true'})
+
+        response = self.client.get(reverse('field-discrepancies'), {
+            'field': 'Amount', 'since': '2000-01-01'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(
+            {result['record_id'] for result in response.data['results']}, {'001', '002'})
+
+        response = self.client.get(reverse('field-discrepancies'), {
+            'run': first_run, 'key': '002'})
+        self.assertEqual(response.data['count'], 2)
+
+        response = self.client.get(
+            reverse('field-discrepancies'), {'until': '2000-01-01'})
+        self.assertEqual(response.data['count'], 0)
+
+        response = self.client.get(
+            reverse('field-discrepancies'), {'until': '2000-01-01T00:00:00'})
+        self.assertEqual(response.data['count'], 0)
+
+        response = self.client.get(
+            reverse('field-discrepancies'), {'since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(
+            reverse('field-discrepancies'), {'run': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_missing_records(self):
+        self.client.get(self.reconcile_url)
+
+        response = self.client.get(
+            reverse('missing-records'), {'missing_in': 'source'})
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['record_id'], '004')
+
+    def test_discrepancy_summary(self):
+        self.client.get(self.reconcile_url)
+        self.client.get(self.reconcile_url, {'refresh': 'true'})
+
+        response = self.client.get(reverse('discrepancy-summary'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['summary'][0], {
+            'field': 'Amount', 'discrepancies': 4, 'runs': 2, 'keys': 2, 'fields': 1})
+
+        response = self.client.get(
+            reverse('discrepancy-summary'), {'group_by': 'key', 'field': 'Name'})
+        self.assertEqual(response.data['summary'], [
+            {'key': '002', 'discrepancies': 2, 'runs': 2, 'keys': 1, 'fields': 1}])
+
+        response = self.client.get(
+            reverse('discrepancy-summary'), {'group_by': 'date'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConcurrentReconciliationTests(APITransactionTestCase):
+    def test_concurrent_first_requests_store_one_run(self):
+        upload_response = self.client.post(reverse('file-upload'), {
+            'source_file': SimpleUploadedFile(
+                'source.csv', b'ID,Name,Date,Amount\n001,John Doe,2023-01-01,100.00'),
+            'target_file': SimpleUploadedFile(
+                'target.csv', b'ID,Name,Date,Amount\n001,John Doe,2023-01-01,150.00'),
+        }, format='multipart')
+        reconcile_url = reverse('reconcile-files',
+                                args=[upload_response.data['id']])
+        leader_running, follower_checked, leader_done = (
+            threading.Event(), threading.Event(), threading.Event())
+        status_codes = {}
+        get_latest_run = FileReconciliationView.get_latest_run
+
+        def blocking_execute_plan(*args):
+            leader_running.set()
+            follower_checked.wait(5)
+            return execute_plan(*args)
+
+        def racing_get_latest_run(view, reconciliation_file):
+            run = get_latest_run(view, reconciliation_file)
+            if threading.current_thread().name == 'follower' and not follower_checked.is_set():
+                # The follower saw no run while the leader was reconciling, and only
+                # reaches the single flight after the leader has finished.
+                follower_checked.set()
+                leader_done.wait(5)
+            return run
+
+        def request():
+            try:
+                response = APIClient().get(reconcile_url, format='json')
+                status_codes[threading.current_thread().name] = response.status_code
+            finally:
+                connection.close()
+
+        leader = threading.Thread(target=request, name='leader')
+        follower = threading.Thread(target=request, name='follower')
+        with patch('reconciliation.views.execute_plan', side_effect=blocking_execute_plan), \
+                patch.object(FileReconciliationView, 'get_latest_run', racing_get_latest_run):
+            leader.start()
+            leader_running.wait(5)
+            follower.start()
+            leader.join()
+            leader_done.set()
+            follower.join()
+
+        self.assertEqual(status_codes, {
+            'leader': status.HTTP_200_OK, 'follower': status.HTTP_200_OK})
+        self.assertEqual(ReconciliationRun.objects.count(), 1)
+
+
+def crash_worker(*args):
+    """
+    Stand-in for reconcile_pair that kills its worker process, like the OOM killer would.
+    """
+    os._exit(1)
+
+
+class ReconcileBatchCommandTests(SimpleTestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_dir = os.path.join(self.temp_dir.name, 'input')
+        self.output_dir = os.path.join(self.temp_dir.name, 'reports')
+        os.makedirs(os.path.join(self.input_dir, 'source'))
+        os.makedirs(os.path.join(self.input_dir, 'target'))
+        for name in ('january', 'february'):
+            self.write_file(os.path.join('source', f'{name}.csv'),
+                            'ID,Name,Date,Amount\n001,John Doe,2023-01-01,100.00\n002,Jane Smith,2023-01-02,200.00')
+            self.write_file(os.path.join('target', f'{name}.csv'),
+                            'ID,Name,Date,Amount\n001,John Doe,2023-01-01,150.00\n003,Bob Stone,2023-01-03,300.00')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_file(self, name, content):
+        file_path = os.path.join(self.input_dir, name)
+        with open(file_path, mode='w', newline='', encoding='utf-8') as file:
+            file.write(content)
+        return file_path
+
+    def test_reconcile_directory(self):
+        stdout = StringIO()
+        call_command('reconcile_batch', self.input_dir, output_dir=self.output_dir,
+                     formats=['json', 'csv', 'html'], workers=2, stdout=stdout)
+
+        self.assertIn('Reconciled 2/2 pairs', stdout.getvalue())
+        self.assertEqual(sorted(os.listdir(self.output_dir)), [
+            'february.csv', 'february.html', 'february.json',
+            'january.csv', 'january.html', 'january.json'])
+        with open(os.path.join(self.output_dir, 'january.json'), encoding='utf-8') as file:
+            report = json.load(file)
+        self.assertEqual(report, reconcile_files(
+            os.path.join(self.input_dir, 'source', 'january.csv'),
+            os.path.join(self.input_dir, 'target', 'january.csv')))
+
+    def test_reconcile_manifest(self):
+        manifest = self.write_file(
+            'manifest.csv', 'name,source,target\njan,source/january.csv,target/january.csv\n')
+
+        call_command('reconcile_batch', manifest, output_dir=self.output_dir,
+                     formats=['csv'], workers=1, stdout=StringIO())
+
+        self.assertEqual(os.listdir(self.output_dir), ['jan.csv'])
+
+    @override_settings(RECONCILIATION_MEMORY_BUDGET=1)
+    def test_reconcile_memory_budget_flag_raises_budget(self):
+        stdout = StringIO()
+        call_command('reconcile_batch', self.input_dir, output_dir=self.output_dir,
+                     memory_budget=10**9, workers=1, stdout=stdout)
+
+        self.assertIn('january: hash_join', stdout.getvalue())
+
+    def test_reconcile_manifest_rejects_unsafe_names(self):
+        for name in ('../escaped', '/tmp/escaped', '..'):
+            manifest = self.write_file(
+                'manifest.csv', f'name,source,target\n{name},source/january.csv,target/january.csv\n')
+
+            with self.assertRaises(CommandError):
+                call_command('reconcile_batch', manifest, output_dir=self.output_dir,
+                             workers=1, stdout=StringIO())
+        self.assertFalse(os.path.exists(self.output_dir))
+        self.assertFalse(os.path.exists(
+            os.path.join(self.temp_dir.name, 'escaped.json')))
+
+    def test_reconcile_failed_pair(self):
+        self.write_file(os.path.join('target', 'february.csv'),
+                        'ID,Name,Amount\n001,John Doe,150.00')
+
+        with self.assertRaises(CommandError):
+            call_command('reconcile_batch', self.input_dir, output_dir=self.output_dir,
+                         workers=2, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(os.listdir(self.output_dir), ['january.json'])
+
+    def test_reconcile_broken_pool(self):
+        stdout, stderr = StringIO(), StringIO()
+        with patch('reconciliation.management.commands.reconcile_batch.reconcile_pair', crash_worker):
+            with self.assertRaises(CommandError):
+                call_command('reconcile_batch', self.input_dir, output_dir=self.output_dir,
+                             workers=2, stdout=stdout, stderr=stderr)
+
+        self.assertIn('Reconciled 0/2 pairs', stdout.getvalue())
+        self.assertIn('january', stderr.getvalue())
+        self.assertIn('february', stderr.getvalue())
+
+    def test_reconcile_unmatched_files(self):
+        self.write_file(os.path.join('source', 'march.csv'), 'ID,Name\n001,John Doe')
+        self.write_file(os.path.join('target', 'april.csv'), 'ID,Name\n001,John Doe')
+        stdout, stderr = StringIO(), StringIO()
+
+        with self.assertRaises(CommandError):
+            call_command('reconcile_batch', self.input_dir, output_dir=self.output_dir,
+                         workers=2, stdout=stdout, stderr=stderr)
+
+        self.assertIn('No target file for march.csv', stderr.getvalue())
+        self.assertIn('No source file for april.csv', stderr.getvalue())
+        self.assertIn('Reconciled 2/4 pairs', stdout.getvalue())
+        self.assertEqual(sorted(os.listdir(self.output_dir)), [
+            'february.json', 'january.json'])
+
+    def test_reconcile_missing_input(self):
+        with self.assertRaises(CommandError):
+            call_command('reconcile_batch', os.path.join(
+                self.temp_dir.name, 'missing'), stdout=StringIO())
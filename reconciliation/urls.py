@@ -1,5 +1,12 @@
 from django.urls import path
-from reconciliation.views import FileUploadView, FileReconciliationView
+from reconciliation.views import (
+    FileUploadView,
+    FileReconciliationView,
+    ReconciliationRunView,
+    MissingRecordListView,
+    FieldDiscrepancyListView,
+    DiscrepancySummaryView,
+)
 from rest_framework.urlpatterns import format_suffix_patterns
 
 
@@ -7,6 +14,14 @@ urlpatterns = [
     path('upload/', FileUploadView.as_view(), name='file-upload'),
     path('reconcile/<int:id>/',
          FileReconciliationView.as_view(), name='reconcile-files'),
+    path('runs/<int:id>/',
+         ReconciliationRunView.as_view(), name='reconciliation-run'),
+    path('results/missing/',
+         MissingRecordListView.as_view(), name='missing-records'),
+    path('results/discrepancies/',
+         FieldDiscrepancyListView.as_view(), name='field-discrepancies'),
+    path('results/discrepancies/summary/',
+         DiscrepancySummaryView.as_view(), name='discrepancy-summary'),
 ]
 
 urlpatterns = format_suffix_patterns(
@@ -25,6 +25,21 @@ def find_missing_records(source_dict: dict[str, dict], target_dict: dict[str, di
     return [record for record_id, record in source_dict.items() if record_id not in target_dict]
 
 
+def compare_records(source_record: dict[str, str], target_record: dict[str, str]) -> list[dict]:
+    """
+    Compare two records field by field and return the details of the fields that differ.
+    """
+    discrepancy_details = []
+    for key in source_record:
+        if source_record[key] != target_record[key]:
+            discrepancy_details.append({
+                'field': key,
+                'source_value': source_record[key],
+                'target_value': target_record[key]
+            })
+    return discrepancy_details
+
+
 def find_discrepancies(source_dict: dict[str, dict], target_dict: dict[str, dict]) -> list[dict]:
     """
     Find discrepancies between the source and target dictionaries.
@@ -32,15 +47,8 @@ def find_discrepancies(source_dict: dict[str, dict], target_dict: dict[str, dict
     discrepancies = []
     for record_id, source_record in source_dict.items():
         if record_id in target_dict:
-            target_record = target_dict[record_id]
-            discrepancy_details = []  # Collect discrepancies as a list
-            for key in source_record:
-                if source_record[key] != target_record[key]:
-                    discrepancy_details.append({
-                        'field': key,
-                        'source_value': source_record[key],
-                        'target_value': target_record[key]
-                    })
+            discrepancy_details = compare_records(
+                source_record, target_dict[record_id])
 
             if discrepancy_details:
                 discrepancies.append({
@@ -74,6 +82,19 @@ def validate_target_source_header(source_headers: list[str], target_headers: lis
     return True
 
 
+def read_csv_headers(file_path: str) -> list[str]:
+    """
+    Read only the header row of a CSV file.
+
+    file_path: path to the CSV file
+    """
+    try:
+        with open(file_path, mode='r', newline='', encoding='utf-8') as file:
+            return csv.DictReader(file).fieldnames or []
+    except FileNotFoundError as e:
+        raise FileNotFoundError(f"File not found: {file_path}")
+
+
 def read_csv_file(file_path: str) -> dict[str, dict]:
     """
     Read a CSV file and return its normalized data as a dictionary keyed by the specified id_field.
@@ -94,13 +115,30 @@ def read_csv_file(file_path: str) -> dict[str, dict]:
             return headers, data_dict
     except FileNotFoundError as e:
         raise FileNotFoundError(f"File not found: {file_path}")
+    except MemoryError:
+        raise
     except Exception as e:
         raise Exception(f"An error occurred: {e}")
 
 
+def sort_report(response_data: dict[str, list[dict]], id_field: str) -> dict[str, list[dict]]:
+    """
+    Order missing records and discrepancies by record id, so every reconciliation strategy
+    returns the same report. The lists are sorted in place to avoid copying the report.
+
+    response_data: report with missing_in_target, missing_in_source and discrepancies
+    id_field: name of the id column of the missing records
+    """
+    response_data["missing_in_target"].sort(key=lambda record: record[id_field])
+    response_data["missing_in_source"].sort(key=lambda record: record[id_field])
+    response_data["discrepancies"].sort(key=lambda discrepancy: discrepancy['id'])
+    return response_data
+
+
 def reconcile_files(source_file: str, target_file: str) -> dict[str, list[dict]]:
     """
-    Reconcile the source and target CSV files and return the missing records and discrepancies.
+    Reconcile the source and target CSV files and return the missing records and discrepancies,
+    ordered by record id.
 
     source_file: path to the source CSV file
     target_file: path to the target CSV file
@@ -120,4 +158,4 @@ def reconcile_files(source_file: str, target_file: str) -> dict[str, list[dict]]
         "discrepancies": discrepancies,
     }
 
-    return response_data
+    return sort_report(response_data, source_headers[0])
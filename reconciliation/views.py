@@ -1,15 +1,27 @@
-import csv
 import logging
+from django.conf import settings
 from django.http import HttpResponse, Http404, JsonResponse
 from rest_framework import status,  generics
+from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.response import Response
-from reconciliation.serializers import ReconciliationFileSerializer
-from reconciliation.models import ReconciliationFile
-from reconciliation.utils import reconcile_files
+from reconciliation.serializers import ReconciliationFileSerializer, MissingRecordSerializer, FieldDiscrepancySerializer
+from reconciliation.models import ReconciliationFile, ReconciliationRun, MissingRecord, FieldDiscrepancy
+from reconciliation.concurrency import AdmissionController, ReconciliationOverloaded, SingleFlight
+from reconciliation.engine import execute_plan, get_memory_budget, plan_reconciliation
+from reconciliation.reports import write_csv_report
+from reconciliation.store import save_reconciliation_run, load_report, filter_results, summarize_discrepancies
 
 
 logger = logging.getLogger(__name__)
 
+reconciliation_flights = SingleFlight()
+admission_controller = AdmissionController(
+    max_bytes=settings.RECONCILIATION_MAX_CONCURRENT_BYTES,
+    max_queued=settings.RECONCILIATION_MAX_QUEUED,
+    queue_timeout=settings.RECONCILIATION_QUEUE_TIMEOUT,
+    retry_after=settings.RECONCILIATION_RETRY_AFTER,
+)
+
 
 class FileUploadView(generics.CreateAPIView):
     queryset = ReconciliationFile.objects.all()
@@ -53,7 +65,36 @@ class FileUploadView(generics.CreateAPIView):
         return file.name.endswith('.csv') or file.content_type == 'text/csv'
 
 
-class FileReconciliationView(generics.RetrieveAPIView):
+class ReportResponseMixin:
+    """
+    Render a reconciliation report as JSON, CSV or HTML.
+    """
+
+    def render_report(self, request, response_data, format=None, run=None):
+        """
+        Render the report in the format requested through the URL suffix or the format query parameter.
+        """
+        response_format = request.query_params.get('format', 'json')
+        response_format = format if format else response_format
+
+        if response_format == 'csv':
+            return self.generate_csv_response(**response_data)
+        elif response_format == 'html':
+            return Response(response_data, template_name='reconciliation_report.html')
+        else:
+            return Response({"message": "Reconciliation report generated successfully", "run": run.id if run else None, "report": response_data}, status=status.HTTP_200_OK)
+
+    def generate_csv_response(self, **response_data):
+        """
+        Generate CSV response with proper formatting for missing records and discrepancies.
+        """
+        response = HttpResponse(content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="reconciliation.csv"'
+        write_csv_report(response, response_data)
+        return response
+
+
+class FileReconciliationView(ReportResponseMixin, generics.RetrieveAPIView):
     queryset = ReconciliationFile.objects.all()
     serializer_class = ReconciliationFileSerializer
     lookup_field = 'id'
@@ -77,21 +118,26 @@ class FileReconciliationView(generics.RetrieveAPIView):
         try:
             format = kwargs.get('format')
             reconciliation_file = self.get_object()
-            source_file = reconciliation_file.source_file.path
-            target_file = reconciliation_file.target_file.path
-
-            response_data = reconcile_files(source_file, target_file)
-            response_format = request.query_params.get('format', 'json')
-            response_format = format if format else response_format
 
-            if response_format == 'csv':
-                return self.generate_csv_response(**response_data)
-            elif response_format == 'html':
-                return Response(response_data, template_name='reconciliation_report.html')
+            # Uploaded files never change, so the latest stored run is served unless
+            # the client explicitly asks for a fresh reconciliation.
+            refresh = self.refresh_requested(request)
+            run = None if refresh else self.get_latest_run(reconciliation_file)
+            if run is not None:
+                response_data = load_report(run)
             else:
-                return Response({"message": "Reconciliation report generated successfully", "report": response_data}, status=status.HTTP_200_OK)
+                # Concurrent requests for the same file share one reconciliation; the
+                # report is rendered per request, so every format is served from it.
+                run, response_data = reconciliation_flights.do(
+                    reconciliation_file.id, lambda: self.load_or_reconcile(reconciliation_file, refresh))
+
+            return self.render_report(request, response_data, format, run)
         except Http404:
             return Response({"error": "File not found"}, status=status.HTTP_404_NOT_FOUND)
+        except ReconciliationOverloaded as e:
+            logger.warning(f"Reconciliation rejected: {e}")
+            return Response({"error": str(e)}, status=status.HTTP_429_TOO_MANY_REQUESTS,
+                            headers={"Retry-After": str(e.retry_after)})
         except ValueError as e:
             logger.error(f"Error during reconciliation: {e}")
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -99,49 +145,124 @@ class FileReconciliationView(generics.RetrieveAPIView):
             logger.error(f"Error during reconciliation: {e}")
             return Response({"error": "Unable to reconcile files"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    def generate_csv_response(self, **response_data):
+    def refresh_requested(self, request):
         """
-        Generate CSV response with proper formatting for missing records and discrepancies.
+        Check whether the refresh query parameter asks to recompute the reconciliation.
         """
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="reconciliation.csv"'
-        writer = csv.writer(response)
+        return request.query_params.get('refresh', '').lower() in ('1', 'true', 'yes')
 
-        self.generate_missing_records_section(
-            writer, 'Missing in Target', response_data.get('missing_in_target', []))
-        self.generate_missing_records_section(
-            writer, 'Missing in Source', response_data.get('missing_in_source', []))
-        self.generate_discrepancies_section(
-            writer, response_data.get('discrepancies', []))
+    def get_latest_run(self, reconciliation_file):
+        """
+        Return the most recent stored run of the reconciliation file, if any.
+        """
+        return reconciliation_file.runs.order_by('-id').first()
 
-        return response
+    def load_or_reconcile(self, reconciliation_file, refresh):
+        """
+        Load the latest stored run, which another flight may have stored since the caller
+        checked, and only reconcile when there is none or a refresh was requested.
+        """
+        if not refresh:
+            run = self.get_latest_run(reconciliation_file)
+            if run is not None:
+                return run, load_report(run)
+        return self.reconcile(reconciliation_file)
+
+    def reconcile(self, reconciliation_file):
+        """
+        Plan, execute and store a reconciliation once the admission controller has room
+        for the size of its input files.
+        """
+        source_file = reconciliation_file.source_file.path
+        target_file = reconciliation_file.target_file.path
+        weight = reconciliation_file.source_file.size + reconciliation_file.target_file.size
+
+        def run_reconciliation():
+            plan = plan_reconciliation(
+                source_file, target_file, get_memory_budget(reconciliation_file.memory_budget))
+            self.record_plan(reconciliation_file, plan)
+            response_data = execute_plan(source_file, target_file, plan)
+            if 'fallback_from' in plan:
+                self.record_plan(reconciliation_file, plan)
+            run = save_reconciliation_run(
+                reconciliation_file, plan, response_data)
+            return run, response_data
+
+        return admission_controller.run(weight, run_reconciliation)
 
-    def generate_missing_records_section(self, writer, section_title, missing_records):
+    def record_plan(self, reconciliation_file, plan):
         """
-        Generate a CSV section for missing records (either in target or source).
+        Store the execution plan chosen for the reconciliation on the job.
         """
-        writer.writerow([section_title])
-        writer.writerow(['ID', 'Name', 'Date', 'Amount'])
-        for record in missing_records:
-            writer.writerow([record.get('ID'), record.get(
-                'Name'), record.get('Date'), record.get('Amount')])
-        writer.writerow([])
+        reconciliation_file.execution_plan = plan
+        reconciliation_file.save(update_fields=['execution_plan'])
 
-    def generate_discrepancies_section(self, writer, discrepancies):
+
+class ReconciliationRunView(ReportResponseMixin, generics.RetrieveAPIView):
+    queryset = ReconciliationRun.objects.all()
+    lookup_field = 'id'
+
+    def get(self, request, *args, **kwargs):
+        """
+        Render the stored report of a previous reconciliation run without recomputing it.
+        """
+        run_id = kwargs.get(self.lookup_field)
+        try:
+            run = ReconciliationRun.objects.get(id=run_id)
+        except ReconciliationRun.DoesNotExist:
+            logger.error(f"Reconciliation run with ID {run_id} not found.")
+            return Response({"error": "Run not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        return self.render_report(request, load_report(run), kwargs.get('format'), run)
+
+
+class ResultPagination(LimitOffsetPagination):
+    default_limit = 100
+    max_limit = 1000
+
+
+class StoredResultListView(generics.ListAPIView):
+    pagination_class = ResultPagination
+
+    def get_queryset(self):
+        """
+        Filter stored results with the run, file, field, key, since and until query parameters.
+        """
+        return filter_results(super().get_queryset(), self.request.query_params)
+
+    def list(self, request, *args, **kwargs):
         """
-        Generate  a CSV section for discrepancy records
+        Overriding list method to report invalid filters as a bad request.
         """
-        writer.writerow(['Discrepancies'])
-        writer.writerow(['ID', 'Field', 'Source Value', 'Target Value'])
-        for discrepancy in discrepancies:
-            discrepancy_id = discrepancy['id']
-            for detail in discrepancy['discrepancy_details']:
-                writer.writerow([
-                    discrepancy_id,
-                    detail['field'],
-                    detail['source_value'],
-                    detail['target_value']
-                ])
+        try:
+            return super().list(request, *args, **kwargs)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class MissingRecordListView(StoredResultListView):
+    queryset = MissingRecord.objects.select_related('run').order_by('-run_id', 'id')
+    serializer_class = MissingRecordSerializer
+
+
+class FieldDiscrepancyListView(StoredResultListView):
+    queryset = FieldDiscrepancy.objects.select_related('run').order_by('-run_id', 'id')
+    serializer_class = FieldDiscrepancySerializer
+
+
+class DiscrepancySummaryView(FieldDiscrepancyListView):
+    pagination_class = None
+
+    def list(self, request, *args, **kwargs):
+        """
+        Aggregate the filtered discrepancies across runs, grouped by the group_by query parameter.
+        """
+        try:
+            summary = summarize_discrepancies(
+                self.get_queryset().order_by(), request.query_params.get('group_by', 'field'))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"summary": summary}, status=status.HTTP_200_OK)
 
 
 def custom_404(request, exception):